@@ -27,13 +27,13 @@ class Graph(Generic[_T]):
                 self.add_dependency(node, dependency)
 
     def add_node(self, identifier: _T) -> None:
-        if identifier not in self.nodes:
+        if identifier not in self.dependencies:
             self.nodes.append(identifier)
             self.dependencies[identifier] = []
             self.dependants[identifier] = []
 
     def add_dependency(self, node: _T, dependency: _T) -> None:
-        assert dependency in self.nodes
+        assert dependency in self.dependencies
 
         if dependency not in self.dependencies[node]:
             self.dependencies[node].append(dependency)
@@ -41,22 +41,19 @@ class Graph(Generic[_T]):
 
     def remove_node(self, node: _T) -> None:
         self.nodes.remove(node)
-        del self.dependencies[node]
-        del self.dependants[node]
 
-        for other in self.nodes:
-            try:
-                self.dependencies[other].remove(node)
-            except ValueError:
-                pass
+        # Edges are always recorded in both directions, so only the nodes
+        # directly linked to this one need to be visited.
+        for dependency in self.dependencies.pop(node):
+            if dependency != node:
+                self.dependants[dependency].remove(node)
 
-            try:
-                self.dependants[other].remove(node)
-            except ValueError:
-                pass
+        for dependant in self.dependants.pop(node):
+            if dependant != node:
+                self.dependencies[dependant].remove(node)
 
     def remove_dependency(self, node: _T, dependency: _T) -> None:
-        assert dependency in self.nodes
+        assert dependency in self.dependencies
 
         try:
             self.dependencies[node].remove(dependency)
@@ -180,4 +177,5 @@ def topological_sort(
     assert not remaining.nodes
     assert is_topologically_sorted(result, graph)
 
-    return [node for node in result if node in nodes]
+    nodes_set = set(nodes)
+    return [node for node in result if node in nodes_set]
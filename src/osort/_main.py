@@ -1,6 +1,5 @@
 import argparse
 import difflib
-import re
 import sys
 
 from osort import __version__
@@ -15,65 +14,27 @@ from osort._utils import (
 )
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Sort python statements into dependency order",
-    )
-
-    parser.add_argument(
-        "--version",
-        dest="version",
-        action="store_true",
-        help="Outputs version information and then exit",
-    )
-    parser.add_argument(
-        "--diff",
-        dest="show_diff",
-        action="store_true",
-        help="Prints a diff of all changes osort would make to a file.",
-    )
-    parser.add_argument(
-        "--check",
-        dest="check",
-        action="store_true",
-        help="Check the file for unsorted statements.  Returns 0 if nothing "
-        "needs to be changed.  Otherwise returns 1.",
-    )
-    parser.add_argument(
-        "--alpha",
-        dest="sort_fields",
-        action="store_true",
-        help="Sort the fields alphabetically",
-    )
-    parser.add_argument(
-        "files", nargs="*", help="One or more python files to sort"
-    )
-
-    args = parser.parse_args()
-
-    if args.version:
-        sys.stdout.write(f"osort {__version__}\n")
-        return
-
+def _sort_files(args, messages):
     unsorted = 0
     unsortable = 0
     unchanged = 0
 
     for path in find_python_files(args.files):
         errors = False
+        escaped_path = escape_path(path)
 
         try:
             original_bytes = path.read_bytes()
         except FileNotFoundError:
-            sys.stderr.write(f"ERROR: {escape_path(path)} does not exist\n")
+            messages.append(f"ERROR: {escaped_path} does not exist\n")
             unsortable += 1
             continue
         except IsADirectoryError:
-            sys.stderr.write(f"ERROR: {escape_path(path)} is a directory\n")
+            messages.append(f"ERROR: {escaped_path} is a directory\n")
             unsortable += 1
             continue
         except PermissionError:
-            sys.stderr.write(f"ERROR: {escape_path(path)} is not readable\n")
+            messages.append(f"ERROR: {escaped_path} is not readable\n")
             unsortable += 1
             continue
 
@@ -83,8 +44,8 @@ def main():
         try:
             encoding = detect_encoding(original_bytes)
         except UnknownEncodingError as exc:
-            sys.stderr.write(
-                f"ERROR: unknown encoding, {exc.encoding!r}, in {escape_path(path)}\n"
+            messages.append(
+                f"ERROR: unknown encoding, {exc.encoding!r}, in {escaped_path}\n"
             )
             unsortable += 1
             continue
@@ -92,8 +53,8 @@ def main():
         try:
             original = original_bytes.decode(encoding)
         except UnicodeDecodeError as exc:
-            sys.stderr.write(
-                f"ERROR: encoding error in {escape_path(path)}: {exc}\n"
+            messages.append(
+                f"ERROR: encoding error in {escaped_path}: {exc}\n"
             )
             unsortable += 1
             continue
@@ -105,8 +66,8 @@ def main():
             nonlocal errors
             errors = True
 
-            sys.stderr.write(
-                f"ERROR: syntax error in {escape_path(path)}: "
+            messages.append(
+                f"ERROR: syntax error in {escaped_path}: "
                 + f"line {lineno}, column {col_offset}\n"
             )
 
@@ -114,30 +75,21 @@ def main():
             nonlocal errors
             errors = True
 
-            sys.stderr.write(
+            messages.append(
                 f"ERROR: unresolved dependency {name!r} "
-                + f"in {escape_path(path)}: "
+                + f"in {escaped_path}: "
                 + f"line {lineno}, column {col_offset}\n"
             )
 
         def _on_wildcard_import(**kwargs):
-            sys.stderr.write(
+            messages.append(
                 "WARNING: can't determine dependencies on * import\n"
             )
 
-        updated = osort(
-            original,
-            filename=escape_path(path),
-            sort_fields=args.sort_fields,
-            on_parse_error=_on_parse_error,
-            on_unresolved=_on_unresolved,
-            on_wildcard_import=_on_wildcard_import,
-        )
-
         try:
             updated = osort(
                 original,
-                filename=escape_path(path),
+                filename=escaped_path,
                 sort_fields=args.sort_fields,
                 on_parse_error=_on_parse_error,
                 on_unresolved=_on_unresolved,
@@ -154,11 +106,11 @@ def main():
         if original != updated:
             unsorted += 1
             if args.check:
-                sys.stderr.write(
-                    f"ERROR: {escape_path(path)} is incorrectly sorted\n"
+                messages.append(
+                    f"ERROR: {escaped_path} is incorrectly sorted\n"
                 )
             else:
-                sys.stderr.write(f"Sorting {escape_path(path)}\n")
+                messages.append(f"Sorting {escaped_path}\n")
 
                 # The logic for converting from bytes to text is duplicated in
                 # `osort` and here because we need access to the text to be able
@@ -167,7 +119,7 @@ def main():
                 # which we use later for printing the diff.
                 updated_bytes = updated
                 if newline != "\n":
-                    updated_bytes = re.sub("\n", newline, updated_bytes)
+                    updated_bytes = updated_bytes.replace("\n", newline)
                 updated_bytes = updated_bytes.encode(encoding)
 
                 path.write_bytes(updated_bytes)
@@ -175,7 +127,7 @@ def main():
             unchanged += 1
 
         if args.show_diff:
-            sys.stderr.writelines(
+            messages.extend(
                 difflib.unified_diff(
                     original.splitlines(keepends=True),
                     updated.splitlines(keepends=True),
@@ -199,7 +151,7 @@ def main():
         if not unsorted and not unchanged and not unsortable:
             summary.append("No files are present to be sorted. Nothing to do.")
 
-        sys.stderr.write(", ".join(summary) + "\n")
+        messages.append(", ".join(summary) + "\n")
 
         if unsorted or unsortable:
             sys.exit(1)
@@ -222,7 +174,57 @@ def main():
         if not unsorted and not unchanged and not unsortable:
             summary.append("No files are present to be sorted. Nothing to do.")
 
-        sys.stderr.write(", ".join(summary) + "\n")
+        messages.append(", ".join(summary) + "\n")
 
         if unsortable:
             sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Sort python statements into dependency order",
+    )
+
+    parser.add_argument(
+        "--version",
+        dest="version",
+        action="store_true",
+        help="Outputs version information and then exit",
+    )
+    parser.add_argument(
+        "--diff",
+        dest="show_diff",
+        action="store_true",
+        help="Prints a diff of all changes osort would make to a file.",
+    )
+    parser.add_argument(
+        "--check",
+        dest="check",
+        action="store_true",
+        help="Check the file for unsorted statements.  Returns 0 if nothing "
+        "needs to be changed.  Otherwise returns 1.",
+    )
+    parser.add_argument(
+        "--alpha",
+        dest="sort_fields",
+        action="store_true",
+        help="Sort the fields alphabetically",
+    )
+    parser.add_argument(
+        "files", nargs="*", help="One or more python files to sort"
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.version:
+        sys.stdout.write(f"osort {__version__}\n")
+        return
+
+    # Messages are collected and written to stderr in one go, rather than with
+    # a separate write for every line.
+    messages = []
+    try:
+        _sort_files(args, messages)
+    finally:
+        sys.stderr.write("".join(messages))
+        sys.stderr.flush()
@@ -1,6 +1,10 @@
+from __future__ import annotations
+
 import ast
-import re
+import hashlib
 import sys
+from collections import OrderedDict
+from typing import Any, Callable, Container
 
 from osort._dependencies import (
     class_statements_initialisation_graph,
@@ -20,11 +24,13 @@ from osort._graphs import (
     topological_sort,
 )
 from osort._parsing import parse, split_class
+from osort._statements import Statement
 from osort._utils import (
     detect_encoding,
     detect_newline,
     normalize_newlines,
-    sort_key_from_ending,
+    sort_index_from_ending,
+    sort_index_from_iter,
     sort_key_from_iter,
 )
 
@@ -367,155 +373,155 @@ ODOO_MODEL_METHODS = [
     "_write",
 ]
 
+# Sets of the above for fast membership tests.  The lists are still needed to
+# look up the order in which bindings should be sorted.
+_SPECIAL_PROPERTIES_SET = frozenset(SPECIAL_PROPERTIES)
+_LIFECYCLE_OPERATIONS_SET = frozenset(LIFECYCLE_OPERATIONS)
+_REGULAR_OPERATIONS_SET = frozenset(REGULAR_OPERATIONS)
+_ODOO_SPECIAL_ATTRIBUTES_SET = frozenset(ODOO_SPECIAL_ATTRIBUTES)
+_ODOO_PRIVATE_ATTRIBUTES_SET = frozenset(ODOO_PRIVATE_ATTRIBUTES)
+_ODOO_MODEL_METHODS_SET = frozenset(ODOO_MODEL_METHODS)
 
-def _partition(values, predicate):
-    passed = []
-    failed = []
+# Prefixes of the names of methods that implement computed fields.
+_COMPUTE_PREFIXES = ("_compute_", "_inverse_", "_search_")
 
-    for value in values:
-        if predicate(value):
-            passed.append(value)
-        else:
-            failed.append(value)
-    return passed, failed
+# Assignment node types.  Concrete `ast` node classes are never subclassed so
+# it is safe to test the exact type of a node against this set.
+_ASSIGN_TYPES = frozenset((ast.Assign, ast.AnnAssign, ast.AugAssign))
 
 
-def _is_string(statement):
+def _is_string(statement: Statement) -> bool:
     expr_node = statement.node
-    if not isinstance(expr_node, ast.Expr):
+    if type(expr_node) is not ast.Expr:
         return False
 
     node = expr_node.value
-    if not isinstance(node, ast.Constant):
+    if type(node) is not ast.Constant:
         return False
 
-    return isinstance(node.value, str)
+    return type(node.value) is str
 
 
-def _is_special_property(statement):
-    return any(
-        binding in SPECIAL_PROPERTIES for binding in statement.bindings()
-    )
+def _is_special_property(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return any(binding in _SPECIAL_PROPERTIES_SET for binding in bindings)
 
 
-def _is_odoo_special_attribute(statement):
-    return any(
-        binding in ODOO_SPECIAL_ATTRIBUTES for binding in statement.bindings()
-    )
+def _is_odoo_special_attribute(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return any(binding in _ODOO_SPECIAL_ATTRIBUTES_SET for binding in bindings)
 
 
-def _is_lifecycle_operation(statement):
-    return any(
-        binding in LIFECYCLE_OPERATIONS for binding in statement.bindings()
-    )
+def _is_lifecycle_operation(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return any(binding in _LIFECYCLE_OPERATIONS_SET for binding in bindings)
 
 
-def _is_regular_operation(statement):
-    return any(
-        binding in REGULAR_OPERATIONS for binding in statement.bindings()
-    )
+def _is_regular_operation(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return any(binding in _REGULAR_OPERATIONS_SET for binding in bindings)
 
 
-def _is_odoo_private_attribute(statement):
-    return isinstance(
-        statement.node, (ast.Assign, ast.AnnAssign, ast.AugAssign)
-    ) and any(
-        binding in ODOO_PRIVATE_ATTRIBUTES for binding in statement.bindings()
-    )
+# The following predicates are only applied to assignments.
+
 
+def _is_odoo_private_attribute(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return any(binding in _ODOO_PRIVATE_ATTRIBUTES_SET for binding in bindings)
 
-def _is_private_attribute(statement):
-    return isinstance(
-        statement.node, (ast.Assign, ast.AnnAssign, ast.AugAssign)
-    ) and all(
+
+def _is_private_attribute(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return all(
         binding.startswith("_")  # all part is not required I guess
-        and binding not in ODOO_PRIVATE_ATTRIBUTES
-        for binding in statement.bindings()
+        and binding not in _ODOO_PRIVATE_ATTRIBUTES_SET
+        for binding in bindings
     )
 
 
-def _is_field(statement):
+def _is_field(statement: Statement, bindings: tuple[str, ...]) -> bool:
     return (
-        isinstance(statement.node, (ast.Assign, ast.AnnAssign, ast.AugAssign))
-        and all(
-            not binding.startswith("_") for binding in statement.bindings()
-        )
+        all(not binding.startswith("_") for binding in bindings)
         and statement.text.find("fields.") > 0
     )
 
 
-def _is_property(statement):
-    return isinstance(
-        statement.node, (ast.Assign, ast.AnnAssign, ast.AugAssign)
-    )
+# The following predicates are only applied to function definitions.
 
 
-def _is_default_method(statement):
-    return isinstance(statement.node, ast.FunctionDef) and all(
-        binding == "default_get" or binding.startswith("_default_")
-        for binding in statement.bindings()
-    )
+def _decorator_names(node: ast.FunctionDef) -> Container[str]:
+    """
+    Returns the set of method names called by the decorators of a function,
+    e.g. `{"depends"}` for a function decorated with `@api.depends("field")`.
+    Decorators that are not calls to an attribute are ignored.
+    """
+    return {
+        decorator.func.attr
+        for decorator in node.decorator_list
+        if type(decorator) is ast.Call
+        and type(decorator.func) is ast.Attribute
+    }
 
 
-def _is_compute_method(statement):
-    return isinstance(statement.node, ast.FunctionDef) and (
-        any(
-            isinstance(dec, ast.Call) and dec.func.attr == "depends"
-            for dec in statement.node.decorator_list
-        )
-        or all(
-            binding.startswith("_compute_")
-            or binding.startswith("_inverse_")
-            or binding.startswith("_search_")
-            for binding in statement.bindings()
-        )
+def _is_default_method(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return all(
+        binding == "default_get" or binding.startswith("_default_")
+        for binding in bindings
     )
 
 
-def _is_selection_method(statement):
-    return isinstance(statement.node, ast.FunctionDef) and all(
-        binding.startswith("_selection_") for binding in statement.bindings()
+def _is_compute_method(
+    statement: Statement,
+    bindings: tuple[str, ...],
+    decorators: Container[str],
+) -> bool:
+    return "depends" in decorators or all(
+        binding.startswith(_COMPUTE_PREFIXES) for binding in bindings
     )
 
 
-def _is_constraint_method(statement):
-    return isinstance(statement.node, ast.FunctionDef) and any(
-        isinstance(dec, ast.Call) and dec.func.attr == "constrains"
-        for dec in statement.node.decorator_list
-    )
-
+def _is_selection_method(
+    statement: Statement, bindings: tuple[str, ...]
+) -> bool:
+    return all(binding.startswith("_selection_") for binding in bindings)
 
-def _is_onchange_method(statement):
-    return isinstance(statement.node, ast.FunctionDef) and any(
-        isinstance(dec, ast.Call) and dec.func.attr == "onchange"
-        for dec in statement.node.decorator_list
-    )
 
+def _is_constraint_method(
+    statement: Statement,
+    bindings: tuple[str, ...],
+    decorators: Container[str],
+) -> bool:
+    return "constrains" in decorators
 
-def _is_orm_override(statement):
-    return isinstance(statement.node, ast.FunctionDef) and any(
-        binding in ODOO_MODEL_METHODS for binding in statement.bindings()
-    )
 
+def _is_onchange_method(
+    statement: Statement,
+    bindings: tuple[str, ...],
+    decorators: Container[str],
+) -> bool:
+    return "onchange" in decorators
 
-def _is_action(statement):
-    return isinstance(statement.node, ast.FunctionDef) and any(
-        binding.startswith("action_") for binding in statement.bindings()
-    )
 
+def _is_orm_override(statement: Statement, bindings: tuple[str, ...]) -> bool:
+    return any(binding in _ODOO_MODEL_METHODS_SET for binding in bindings)
 
-def _is_class(statement):
-    return isinstance(statement.node, ast.ClassDef)
 
+def _is_action(statement: Statement, bindings: tuple[str, ...]) -> bool:
+    return any(binding.startswith("action_") for binding in bindings)
 
-def _statement_binding_sort_key(binding_key):
-    def _safe_binding_key(binding):
-        try:
-            return binding_key(binding)
-        except KeyError:
-            return sys.maxsize
 
-    def _key(statement):
+def _statement_binding_sort_key(
+    index: dict[str, int],
+) -> Callable[[Statement], tuple[int, str]]:
+    def _key(statement: Statement) -> tuple[int, str]:
         """
         Returns a tuple of (key, binding) to sort the statements on the binding_key first,
         and then alphabetically on their binding. Alphabetic sorting will work for the cases when
@@ -524,16 +530,44 @@ def _statement_binding_sort_key(binding_key):
         """
         bindings = statement.bindings()
         return (
-            min(_safe_binding_key(binding) for binding in bindings),
+            min(index.get(binding, sys.maxsize) for binding in bindings),
             bindings[0],
         )
 
     return _key
 
 
-def _statement_text_sorted_class(statement, sort_fields=False):
+# The hard-coded orders never change, so build their sort keys once.
+_SPECIAL_PROPERTIES_KEY = _statement_binding_sort_key(
+    sort_index_from_iter(SPECIAL_PROPERTIES)
+)
+_LIFECYCLE_OPERATIONS_KEY = _statement_binding_sort_key(
+    sort_index_from_iter(LIFECYCLE_OPERATIONS)
+)
+_REGULAR_OPERATIONS_KEY = _statement_binding_sort_key(
+    sort_index_from_iter(REGULAR_OPERATIONS)
+)
+_ODOO_PRIVATE_ATTRIBUTES_KEY = _statement_binding_sort_key(
+    sort_index_from_iter(ODOO_PRIVATE_ATTRIBUTES)
+)
+_ODOO_SPECIAL_ATTRIBUTES_KEY = _statement_binding_sort_key(
+    sort_index_from_iter(ODOO_SPECIAL_ATTRIBUTES)
+)
+_ODOO_MODEL_METHODS_KEY = _statement_binding_sort_key(
+    sort_index_from_iter(ODOO_MODEL_METHODS)
+)
+
+
+def _statement_text_sorted_class(
+    statement: Statement, sort_fields: bool = False
+) -> str:
     head_text, unsorted_statements = split_class(statement)
 
+    # A single statement can't be reordered.  The class text is returned as
+    # is whenever its body order is unchanged, so there is nothing to do.
+    if len(unsorted_statements) <= 1:
+        return statement.text
+
     statements = list(unsorted_statements)
 
     # Take a snapshot of any hard dependencies between statements so that we can
@@ -546,64 +580,83 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     else:
         docstrings = []
 
-    # General class stuff
-    special_properties, statements = _partition(
-        statements, _is_special_property
-    )
-
-    lifecycle_operations, statements = _partition(
-        statements, _is_lifecycle_operation
-    )
-
-    regular_operations, statements = _partition(
-        statements, _is_regular_operation
-    )
-
-    inner_classes, statements = _partition(statements, _is_class)
-
-    # add a special case for init (and perhaps _sql_constrain because despite the guideline, it always comes after
-    # fields)
-    odoo_special_attributes, statements = _partition(
-        statements, _is_odoo_special_attribute
-    )
-
-    odoo_private_attributes, statements = _partition(
-        statements, _is_odoo_private_attribute
-    )
-
-    other_private_attributes, statements = _partition(
-        statements, _is_private_attribute
-    )
+    special_properties = []
+    lifecycle_operations = []
+    regular_operations = []
+    inner_classes = []
+    odoo_special_attributes = []
+    odoo_private_attributes = []
+    other_private_attributes = []
+    orm_overrides = []
+    default_methods = []
+    odoo_fields = []
+    compute_methods = []
+    selection_methods = []
+    constraint_methods = []
+    onchange_methods = []
+    actions = []
+    properties = []
+    methods = []
+
+    # Each statement goes into the first group that it matches, so the order of
+    # the tests below matters.  Tests that only apply to assignments or only to
+    # function definitions are grouped together by node type.
+    for body_statement in statements:
+        node = body_statement.node
+        node_type = type(node)
+        bindings = body_statement.bindings()
+
+        # General class stuff
+        if _is_special_property(body_statement, bindings):
+            special_properties.append(body_statement)
+        elif _is_lifecycle_operation(body_statement, bindings):
+            lifecycle_operations.append(body_statement)
+        elif _is_regular_operation(body_statement, bindings):
+            regular_operations.append(body_statement)
+        elif node_type is ast.ClassDef:
+            inner_classes.append(body_statement)
+        # add a special case for init (and perhaps _sql_constrain because despite the guideline, it always comes after
+        # fields)
+        elif _is_odoo_special_attribute(body_statement, bindings):
+            odoo_special_attributes.append(body_statement)
+
+        elif node_type in _ASSIGN_TYPES:
+            if _is_odoo_private_attribute(body_statement, bindings):
+                odoo_private_attributes.append(body_statement)
+            elif _is_private_attribute(body_statement, bindings):
+                other_private_attributes.append(body_statement)
+            elif _is_field(body_statement, bindings):
+                odoo_fields.append(body_statement)
+            else:
+                properties.append(body_statement)
+
+        elif node_type is ast.FunctionDef:
+            decorators = _decorator_names(node)
+            if _is_orm_override(body_statement, bindings):
+                orm_overrides.append(body_statement)
+            elif _is_default_method(body_statement, bindings):
+                default_methods.append(body_statement)
+            elif _is_compute_method(body_statement, bindings, decorators):
+                compute_methods.append(body_statement)
+            elif _is_selection_method(body_statement, bindings):
+                selection_methods.append(body_statement)
+            elif _is_constraint_method(body_statement, bindings, decorators):
+                constraint_methods.append(body_statement)
+            elif _is_onchange_method(body_statement, bindings, decorators):
+                onchange_methods.append(body_statement)
+            elif _is_action(body_statement, bindings):
+                actions.append(body_statement)
+            else:
+                methods.append(body_statement)
 
-    orm_overrides, statements = _partition(statements, _is_orm_override)
-
-    default_methods, statements = _partition(statements, _is_default_method)
-
-    odoo_fields, statements = _partition(statements, _is_field)
-
-    compute_methods, statements = _partition(statements, _is_compute_method)
-
-    selection_methods, statements = _partition(
-        statements, _is_selection_method
-    )
-
-    constraint_methods, statements = _partition(
-        statements, _is_constraint_method
-    )
-
-    onchange_methods, statements = _partition(statements, _is_onchange_method)
-
-    actions, statements = _partition(statements, _is_action)
-
-    properties, statements = _partition(statements, _is_property)
-
-    methods, statements = statements, []
+        else:
+            methods.append(body_statement)
 
     fields = [statement.bindings()[0] for statement in odoo_fields]
     if sort_fields:
         fields = sorted(fields)
 
-    sorted_statements = []
+    sorted_statements: list[Statement] = []
 
     # === Join groups back together in the correct order =======================
     sorted_statements += docstrings
@@ -611,9 +664,7 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     # Special properties (in hard-coded order).
     sorted_statements += sorted(
         special_properties,
-        key=_statement_binding_sort_key(
-            sort_key_from_iter(SPECIAL_PROPERTIES)
-        ),
+        key=_SPECIAL_PROPERTIES_KEY,
     )
 
     # Inner classes (in original order).
@@ -622,24 +673,18 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     # Odoo private attributes (in hard-coded order).
     sorted_statements += sorted(
         odoo_private_attributes,
-        key=_statement_binding_sort_key(
-            sort_key_from_iter(ODOO_PRIVATE_ATTRIBUTES)
-        ),
+        key=_ODOO_PRIVATE_ATTRIBUTES_KEY,
     )
 
     # Other private attributes (in origial order).
     sorted_statements += other_private_attributes
 
     # Default methods (in fields order, put default_get first).
+    default_methods_index = sort_index_from_ending(default_methods, fields)
+    default_methods_index["default_get"] = -1
     sorted_statements += sorted(
         default_methods,
-        key=lambda statement: (
-            -1
-            if "default_get" in statement.bindings()
-            else _statement_binding_sort_key(
-                sort_key_from_ending(default_methods, fields)
-            )(statement)
-        ),
+        key=_statement_binding_sort_key(default_methods_index),
     )
 
     # Regular properties (in original order).
@@ -657,24 +702,20 @@ def _statement_text_sorted_class(statement, sort_fields=False):
 
     sorted_statements += sorted(
         odoo_special_attributes,
-        key=_statement_binding_sort_key(
-            sort_key_from_iter(ODOO_SPECIAL_ATTRIBUTES)
-        ),
+        key=_ODOO_SPECIAL_ATTRIBUTES_KEY,
     )
 
     # Special class lifecycle methods (in hard-coded order).
     sorted_statements += sorted(
         lifecycle_operations,
-        key=_statement_binding_sort_key(
-            sort_key_from_iter(LIFECYCLE_OPERATIONS)
-        ),
+        key=_LIFECYCLE_OPERATIONS_KEY,
     )
 
     # Compute methods (in fields order).
     sorted_statements += sorted(
         compute_methods,
         key=_statement_binding_sort_key(
-            sort_key_from_ending(compute_methods, fields)
+            sort_index_from_ending(compute_methods, fields)
         ),
     )
 
@@ -683,7 +724,7 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     sorted_statements += sorted(
         selection_methods,
         key=_statement_binding_sort_key(
-            sort_key_from_ending(selection_methods, fields)
+            sort_index_from_ending(selection_methods, fields)
         ),
     )
 
@@ -691,7 +732,7 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     sorted_statements += sorted(
         constraint_methods,
         key=_statement_binding_sort_key(
-            sort_key_from_ending(constraint_methods, fields)
+            sort_index_from_ending(constraint_methods, fields)
         ),
     )
 
@@ -699,16 +740,14 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     sorted_statements += sorted(
         onchange_methods,
         key=_statement_binding_sort_key(
-            sort_key_from_ending(onchange_methods, fields)
+            sort_index_from_ending(onchange_methods, fields)
         ),
     )
 
     # ORM overrides (in hard-coded order).
     sorted_statements += sorted(
         orm_overrides,
-        key=_statement_binding_sort_key(
-            sort_key_from_iter(ODOO_MODEL_METHODS)
-        ),
+        key=_ODOO_MODEL_METHODS_KEY,
     )
 
     # Action methods (in original order).
@@ -720,9 +759,7 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     # Special operations (in hard-coded order).
     sorted_statements += sorted(
         regular_operations,
-        key=_statement_binding_sort_key(
-            sort_key_from_iter(REGULAR_OPERATIONS)
-        ),
+        key=_REGULAR_OPERATIONS_KEY,
     )
 
     # === Re-sort based on dependencies between statements =====================
@@ -738,33 +775,52 @@ def _statement_text_sorted_class(statement, sort_fields=False):
     runtime_graph = class_statements_runtime_graph(
         sorted_statements, ignore_public=True
     )
-    runtime_graph.update(initialisation_graph)
-    replace_cycles(runtime_graph, key=sort_key_from_iter(sorted_statements))
+    # Without any soft dependencies the combined graph would be identical to
+    # the initialisation graph, which the statements are already sorted on.
+    if any(runtime_graph.dependencies.values()):
+        runtime_graph.update(initialisation_graph)
+        replace_cycles(
+            runtime_graph, key=sort_key_from_iter(sorted_statements)
+        )
 
-    sorted_statements = topological_sort(
-        sorted_statements, graph=runtime_graph
-    )
+        # Sorting a list that is already in topological order leaves it
+        # unchanged, so only sort if something is out of place.
+        if not is_topologically_sorted(sorted_statements, graph=runtime_graph):
+            sorted_statements = topological_sort(
+                sorted_statements, graph=runtime_graph
+            )
 
+    # `Statement` does not override `__eq__`, so this compares by identity and
+    # bails out early if the lengths differ.
     if sorted_statements == unsorted_statements:
         return statement.text
 
-    return (
-        head_text
-        + "\n"
-        + "\n".join(
-            statement_text_sorted(body_statement, sort_fields=sort_fields)
-            for body_statement in sorted_statements
+    # Dispatch inline rather than through `statement_text_sorted`, as most
+    # class members are not nested classes.
+    body_texts = [
+        (
+            _statement_text_sorted_class(
+                body_statement, sort_fields=sort_fields
+            )
+            if type(body_statement.node) is ast.ClassDef
+            else body_statement.text
         )
-    )
+        for body_statement in sorted_statements
+    ]
+    return head_text + "\n" + "\n".join(body_texts)
 
 
-def statement_text_sorted(statement, sort_fields=False):
-    node = statement.node
-    if isinstance(node, ast.ClassDef):
+def statement_text_sorted(
+    statement: Statement, sort_fields: bool = False
+) -> str:
+    if type(statement.node) is ast.ClassDef:
         return _statement_text_sorted_class(statement, sort_fields=sort_fields)
     return statement.text
 
 
+_ErrorHandler = Callable[..., None]
+
+
 def _on_unknown_encoding_ignore(message, **kwargs):
     pass
 
@@ -773,14 +829,10 @@ def _on_unknown_encoding_raise(message, *, encoding, **kwargs):
     raise UnknownEncodingError(message, encoding=encoding)
 
 
-def _interpret_on_unknown_encoding_action(on_unknown_encoding):
-    if on_unknown_encoding == "ignore":
-        return _on_unknown_encoding_ignore
-
-    if on_unknown_encoding == "raise":
-        return _on_unknown_encoding_raise
-
-    return on_unknown_encoding
+_UNKNOWN_ENCODING_ACTIONS: dict[str, _ErrorHandler] = {
+    "ignore": _on_unknown_encoding_ignore,
+    "raise": _on_unknown_encoding_raise,
+}
 
 
 def _on_decoding_error_ignore(message, **kwargs):
@@ -791,14 +843,10 @@ def _on_decoding_error_raise(message, **kwargs):
     raise DecodingError(message)
 
 
-def _interpret_on_decoding_error_action(on_decoding_error):
-    if on_decoding_error == "ignore":
-        return _on_decoding_error_ignore
-
-    if on_decoding_error == "raise":
-        return _on_decoding_error_raise
-
-    return on_decoding_error
+_DECODING_ERROR_ACTIONS: dict[str, _ErrorHandler] = {
+    "ignore": _on_decoding_error_ignore,
+    "raise": _on_decoding_error_raise,
+}
 
 
 def _on_parse_error_ignore(message, **kwargs):
@@ -809,14 +857,10 @@ def _on_parse_error_raise(message, *, lineno, col_offset, **kwargs):
     raise ParseError(message, lineno=lineno, col_offset=col_offset)
 
 
-def _interpret_on_parse_error_action(on_parse_error):
-    if on_parse_error == "ignore":
-        return _on_parse_error_ignore
-
-    if on_parse_error == "raise":
-        return _on_parse_error_raise
-
-    return on_parse_error
+_PARSE_ERROR_ACTIONS: dict[str, _ErrorHandler] = {
+    "ignore": _on_parse_error_ignore,
+    "raise": _on_parse_error_raise,
+}
 
 
 def _on_unresolved_ignore(message, *, name, lineno, col_offset, **kwargs):
@@ -832,14 +876,10 @@ def _on_unresolved_raise(message, *, name, lineno, col_offset, **kwargs):
     )
 
 
-def _interpret_on_unresolved_action(on_unresolved):
-    if on_unresolved == "ignore":
-        return _on_unresolved_ignore
-
-    if on_unresolved == "raise":
-        return _on_unresolved_raise
-
-    return on_unresolved
+_UNRESOLVED_ACTIONS: dict[str, _ErrorHandler] = {
+    "ignore": _on_unresolved_ignore,
+    "raise": _on_unresolved_raise,
+}
 
 
 def _on_wildcard_import_ignore(**kwargs):
@@ -854,61 +894,33 @@ def _on_wildcard_import_raise(*, lineno, col_offset, **kwargs):
     )
 
 
-def _interpret_on_wildcard_import_action(on_wildcard_import):
-    if on_wildcard_import == "ignore":
-        return _on_wildcard_import_ignore
-
-    if on_wildcard_import == "raise":
-        return _on_wildcard_import_raise
+_WILDCARD_IMPORT_ACTIONS: dict[str, _ErrorHandler] = {
+    "ignore": _on_wildcard_import_ignore,
+    "raise": _on_wildcard_import_raise,
+}
 
-    return on_wildcard_import
 
-
-def osort(
-    text,
+def _osort_text(
+    text: str,
     *,
-    filename="<unknown>",
-    sort_fields=False,
-    on_unknown_encoding_error="raise",
-    on_decoding_error="raise",
-    on_parse_error="raise",
-    on_unresolved="raise",
-    on_wildcard_import="raise",
-):
-    on_unknown_encoding_error = _interpret_on_unknown_encoding_action(
-        on_unknown_encoding_error
-    )
-    on_decoding_error = _interpret_on_decoding_error_action(on_decoding_error)
-    on_parse_error = _interpret_on_parse_error_action(on_parse_error)
-    on_unresolved = _interpret_on_unresolved_action(on_unresolved)
-    on_wildcard_import = _interpret_on_wildcard_import_action(
-        on_wildcard_import
-    )
-
-    try:
-        encoding = None
-        if isinstance(text, bytes):
-            encoding = detect_encoding(text)
-            text = text.decode(encoding)
-    except UnknownEncodingError as exc:
-        on_unknown_encoding_error(str(exc), encoding=exc.encoding)
-        return text
-
-    except UnicodeDecodeError as exc:
-        on_decoding_error(str(exc))
-        return text
-
-    newline = detect_newline(text)
-    text = normalize_newlines(text)
-
+    filename: str,
+    sort_fields: bool,
+    on_parse_error: _ErrorHandler,
+    on_unresolved: _ErrorHandler,
+    on_wildcard_import: _ErrorHandler,
+) -> str | None:
+    """
+    Sorts text with normalized newlines.  Returns `None` if there is nothing
+    to sort or if sorting was aborted.
+    """
     try:
         statements = list(parse(text, filename=filename))
     except ParseError as exc:
         on_parse_error(str(exc), lineno=exc.lineno, col_offset=exc.col_offset)
-        return text
+        return None
 
     if not statements:
-        return text
+        return None
 
     graph = module_statements_graph(
         statements,
@@ -916,7 +928,7 @@ def osort(
         on_wildcard_import=on_wildcard_import,
     )
     if graph is None:
-        return text
+        return None
 
     replace_cycles(graph, key=sort_key_from_iter(statements))
 
@@ -930,9 +942,125 @@ def osort(
     )
     if output:
         output += "\n"
+    return output
+
+
+_OSORT_CACHE_MAXSIZE = 256
+
+# Maps from a digest of the normalized input text, and the value of
+# `sort_fields`, to the sorted text and the arguments of any `*` import
+# warnings that were emitted while sorting it.  Ordered from least to most
+# recently used.
+_OSORT_CACHE: OrderedDict[
+    tuple[bytes, bool], tuple[str, tuple[dict[str, Any], ...]]
+] = OrderedDict()
+
+
+def _osort_text_cached(
+    text: str,
+    *,
+    filename: str,
+    sort_fields: bool,
+    on_parse_error: _ErrorHandler,
+    on_unresolved: _ErrorHandler,
+    on_wildcard_import: _ErrorHandler,
+) -> str | None:
+    key = (
+        hashlib.blake2b(text.encode("utf-8", "surrogatepass")).digest(),
+        sort_fields,
+    )
+
+    cached = _OSORT_CACHE.get(key)
+    if cached is not None:
+        _OSORT_CACHE.move_to_end(key)
+        cached_output, wildcard_imports = cached
+
+        # Replay warnings so that callers can't tell that the result was
+        # cached.
+        for kwargs in wildcard_imports:
+            on_wildcard_import(**kwargs)
+        return cached_output
+
+    recorded_wildcard_imports: list[dict[str, Any]] = []
+
+    def _on_wildcard_import(**kwargs):
+        recorded_wildcard_imports.append(kwargs)
+        on_wildcard_import(**kwargs)
+
+    output = _osort_text(
+        text,
+        filename=filename,
+        sort_fields=sort_fields,
+        on_parse_error=on_parse_error,
+        on_unresolved=on_unresolved,
+        on_wildcard_import=_on_wildcard_import,
+    )
+
+    # Failures are not cached.  They are reported through callbacks that
+    # should fire again, and are cheap to rediscover.
+    if output is not None:
+        _OSORT_CACHE[key] = (output, tuple(recorded_wildcard_imports))
+        if len(_OSORT_CACHE) > _OSORT_CACHE_MAXSIZE:
+            _OSORT_CACHE.popitem(last=False)
+
+    return output
+
+
+def osort(
+    text: str | bytes,
+    *,
+    filename: str = "<unknown>",
+    sort_fields: bool = False,
+    enable_cache: bool = False,
+    on_unknown_encoding_error: str | _ErrorHandler = "raise",
+    on_decoding_error: str | _ErrorHandler = "raise",
+    on_parse_error: str | _ErrorHandler = "raise",
+    on_unresolved: str | _ErrorHandler = "raise",
+    on_wildcard_import: str | _ErrorHandler = "raise",
+) -> str | bytes:
+    if isinstance(on_unknown_encoding_error, str):
+        on_unknown_encoding_error = _UNKNOWN_ENCODING_ACTIONS[
+            on_unknown_encoding_error
+        ]
+    if isinstance(on_decoding_error, str):
+        on_decoding_error = _DECODING_ERROR_ACTIONS[on_decoding_error]
+    if isinstance(on_parse_error, str):
+        on_parse_error = _PARSE_ERROR_ACTIONS[on_parse_error]
+    if isinstance(on_unresolved, str):
+        on_unresolved = _UNRESOLVED_ACTIONS[on_unresolved]
+    if isinstance(on_wildcard_import, str):
+        on_wildcard_import = _WILDCARD_IMPORT_ACTIONS[on_wildcard_import]
+
+    try:
+        encoding = None
+        if isinstance(text, bytes):
+            encoding = detect_encoding(text)
+            text = text.decode(encoding)
+    except UnknownEncodingError as exc:
+        on_unknown_encoding_error(str(exc), encoding=exc.encoding)
+        return text
+
+    except UnicodeDecodeError as exc:
+        on_decoding_error(str(exc))
+        return text
+
+    newline = detect_newline(text)
+    text = normalize_newlines(text)
+
+    sort_text = _osort_text_cached if enable_cache else _osort_text
+    output = sort_text(
+        text,
+        filename=filename,
+        sort_fields=sort_fields,
+        on_parse_error=on_parse_error,
+        on_unresolved=on_unresolved,
+        on_wildcard_import=on_wildcard_import,
+    )
+    if output is None:
+        return text
 
     if newline != "\n":
-        output = re.sub("\n", newline, output)
+        output = output.replace("\n", newline)
     if encoding is not None:
-        output = output.encode(encoding)
+        return output.encode(encoding)
     return output
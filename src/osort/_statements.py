@@ -10,6 +10,18 @@ from osort._utils import cached_method
 
 
 class Statement:
+    __slots__ = (
+        "text",
+        "node",
+        "start_row",
+        "start_col",
+        # Storage for `cached_method`.
+        "_text_padded_cache",
+        "_requirements_cache",
+        "_method_requirements_cache",
+        "_bindings_cache",
+    )
+
     def __init__(
         self, *, text: str, node: ast.AST, start_row: int, start_col: int
     ) -> None:
@@ -43,7 +55,7 @@ class Statement:
         return tuple(get_method_requirements(self.node))
 
     @cached_method
-    def bindings(self) -> Iterable[str]:
+    def bindings(self) -> tuple[str, ...]:
         """
         Returns an iterable yielding the names bound by this statement.
         """
@@ -16,30 +16,34 @@ else:
     memoize = functools.cache
 
 
+def sort_index_from_iter(values):
+    """
+    Returns a dictionary mapping from each value to its position in `values`.
+    """
+    return {value: index for index, value in enumerate(values)}
+
+
 def sort_key_from_iter(values):
-    index = {statement: index for index, statement in enumerate(values)}
-    key = lambda value: index[value]
-    return key
+    return sort_index_from_iter(values).__getitem__
 
 
-def sort_key_from_ending(statements, sort_base):
+def sort_index_from_ending(statements, sort_base):
     """
-    Sort key function that uses another list which the values
-    of the other fields are part of main values.
-    param values: list of statements
+    Returns a dictionary mapping from the first binding of each statement to
+    the position in `sort_base` of the value that the binding ends with.
+    Bindings that do not end with any value in `sort_base` are left out.
+    param statements: list of statements
     param sort_base: list of strings which are part of strings in values
     """
     other_index = {
         other_value: index for index, other_value in enumerate(sort_base)
     }
-    index = {
+    return {
         statement.bindings()[0]: other_index[other_value]
         for statement in statements
         for other_value in sort_base
         if statement.bindings()[0].endswith(f"_{other_value}")
     }
-    key = lambda value: index[value]
-    return key
 
 
 _T = TypeVar("_T")
@@ -96,6 +100,9 @@ def escape_path(path):
         return shlex.quote(str(path))
 
 
+_UNKNOWN_ENCODING_RE = re.compile("unknown encoding: (.*)")
+
+
 def detect_encoding(bytestring):
     """
     Detect the encoding of a python source file based on "coding" comments, as
@@ -105,7 +112,7 @@ def detect_encoding(bytestring):
         encoding, _ = tokenize.detect_encoding(io.BytesIO(bytestring).readline)
     except SyntaxError as exc:
         raise UnknownEncodingError(
-            exc.msg, encoding=re.match("unknown encoding: (.*)", exc.msg)[1]
+            exc.msg, encoding=_UNKNOWN_ENCODING_RE.match(exc.msg)[1]
         ) from exc
     return encoding
 
@@ -113,19 +120,19 @@ def detect_encoding(bytestring):
 _NEWLINE_RE = re.compile("(\r\n)|(\r)|(\n)")
 
 
-def detect_newline(text):
+def detect_newline(text: str) -> str:
     """
     Detects the newline character used in a source file based on the first
     occurence of '\\n', '\\r' or '\\r\\n'.
     """
-    match = re.search(_NEWLINE_RE, text)
+    match = _NEWLINE_RE.search(text)
     if match is None:
         return "\n"
     return match[0]
 
 
-def normalize_newlines(text):
+def normalize_newlines(text: str) -> str:
     """
     Replaces all occurrences of '\r' and '\\r\\n' with \n.
     """
-    return re.sub(_NEWLINE_RE, "\n", text)
+    return _NEWLINE_RE.sub("\n", text)
@@ -0,0 +1,33 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_TMPFS = "/dev/shm"
+
+_TMPFS_BASETEMP = pytest.StashKey[str]()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Keep the files written by tests in memory where a tmpfs is available.
+    # This has to run before pytest creates `tmp_path_factory` from the
+    # options.  An explicit `--basetemp` wins, and xdist workers inherit a
+    # subdirectory of the controller's base.
+    if config.option.basetemp is not None:
+        return
+    if hasattr(config, "workerinput"):
+        return
+    if not os.path.isdir(_TMPFS) or not os.access(_TMPFS, os.W_OK):
+        return
+
+    basetemp = tempfile.mkdtemp(prefix="pytest-osort-", dir=_TMPFS)
+    config.option.basetemp = basetemp
+    config.stash[_TMPFS_BASETEMP] = basetemp
+
+
+def pytest_unconfigure(config):
+    basetemp = config.stash.get(_TMPFS_BASETEMP, None)
+    if basetemp is not None:
+        shutil.rmtree(basetemp, ignore_errors=True)
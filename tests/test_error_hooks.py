@@ -181,3 +181,20 @@ def test_on_wildcard_import_callback():
         osort(original, on_wildcard_import=on_wildcard_import)
 
     assert exc_info.value.args == (1, 0)
+
+
+def test_on_wildcard_import_callback_cached():
+    original = "from module import *\nuse = name\n"
+
+    calls = []
+
+    def on_wildcard_import(*, lineno, col_offset):
+        calls.append((lineno, col_offset))
+
+    for _ in range(2):
+        actual = osort(
+            original, enable_cache=True, on_wildcard_import=on_wildcard_import
+        )
+        assert actual == original
+
+    assert calls == [(1, 0), (1, 0)]
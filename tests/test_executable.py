@@ -1,10 +1,15 @@
+import contextlib
+import io
+import os
 import pathlib
+import shutil
 import subprocess
 import sys
 
 import pytest
 
 from osort import __version__
+from osort._main import main
 from osort._utils import escape_path
 
 _good = b"""
@@ -57,155 +62,215 @@ def public():
 """
 
 
+def _summary(resorted=0, unchanged=0, unsortable=0, check=False):
+    # Builds the summary line that osort prints after processing all files.
+    if check:
+        singular = plural = (
+            "would be resorted",
+            "would be left unchanged",
+            "would not be sortable",
+        )
+    else:
+        singular = ("was resorted", "was left unchanged", "was not sortable")
+        plural = ("were resorted", "were left unchanged", "were not sortable")
+
+    parts = [
+        (
+            f"{count} file {singular[index]}"
+            if count == 1
+            else f"{count} files {plural[index]}"
+        )
+        for index, count in enumerate((resorted, unchanged, unsortable))
+        if count
+    ]
+    if not parts:
+        parts = ["No files are present to be sorted. Nothing to do."]
+    return ", ".join(parts) + "\n"
+
+
 def _write_fixtures(dirpath, texts):
     paths = []
     for index, text in enumerate(texts):
         path = dirpath / f"file_{index:04}.py"
-        path.write_bytes(text)
+        # Each file is written in a single call, so there is no need for the
+        # buffered writer that `Path.write_bytes` would set up.
+        fd = os.open(
+            path,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0),
+            0o644,
+        )
+        try:
+            os.write(fd, text)
+        finally:
+            os.close(fd)
         paths.append(str(path))
     return paths
 
 
-@pytest.fixture(params=["entrypoint", "module"])
-def check(request):
-    def _check(dirpath):
-        osort_exe = {
-            "entrypoint": ["osort"],
-            "module": [sys.executable, "-m", "osort"],
-        }[request.param]
+def _run_main(argv):
+    stderr = io.StringIO()
+    returncode = 0
+    with contextlib.redirect_stderr(stderr):
+        try:
+            main(argv)
+        except SystemExit as exc:
+            returncode = exc.code
+    return stderr.getvalue(), returncode
 
-        result = subprocess.run(
-            [*osort_exe, "--check", str(dirpath)],
-            capture_output=True,
-            encoding="utf-8",
-        )
-        return result.stderr.splitlines(keepends=True), result.returncode
+
+@pytest.fixture(scope="session")
+def fixture_dirs(tmp_path_factory):
+    # Directories are shared between tests with the same inputs, so only use
+    # this for tests that do not modify the files, i.e. `--check`.
+    cache = {}
+
+    def _fixture_dirs(texts):
+        if texts not in cache:
+            dirpath = tmp_path_factory.mktemp("fixtures")
+            cache[texts] = dirpath, _write_fixtures(dirpath, texts)
+        return cache[texts]
+
+    return _fixture_dirs
+
+
+@pytest.fixture(scope="session")
+def osort_exe():
+    # An absolute path together with `close_fds=False` lets `subprocess` use
+    # `posix_spawn` instead of forking the whole pytest process.
+    path = shutil.which("osort")
+    assert path is not None
+    return path
+
+
+@pytest.fixture
+def check():
+    def _check(dirpath):
+        return _run_main(["--check", str(dirpath)])
 
     return _check
 
 
-@pytest.fixture(params=["entrypoint", "module"])
-def osort(request):
+@pytest.fixture
+def osort():
     def _osort(dirpath):
-        osort_exe = {
-            "entrypoint": ["osort"],
-            "module": [sys.executable, "-m", "osort"],
-        }[request.param]
-
-        result = subprocess.run(
-            [*osort_exe, str(dirpath)],
-            capture_output=True,
-            encoding="utf-8",
-        )
-        return result.stderr.splitlines(keepends=True), result.returncode
+        return _run_main([str(dirpath)])
 
     return _osort
 
 
-def test_check_all_well(check, tmp_path):
-    _write_fixtures(tmp_path, [_good, _good, _good])
+def test_check_all_well(check, fixture_dirs):
+    dirpath, _ = fixture_dirs((_good, _good, _good))
     expected_msgs = [
-        "3 files would be left unchanged\n",
+        _summary(unchanged=3, check=True),
     ]
     expected_status = 0
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_one_unsorted(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_unsorted, _good, _good])
+def test_check_one_unsorted(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_unsorted, _good, _good))
     expected_msgs = [
         f"ERROR: {escape_path(paths[0])} is incorrectly sorted\n",
-        "1 file would be resorted, 2 files would be left unchanged\n",
+        _summary(resorted=1, unchanged=2, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_all_unsorted(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_unsorted, _unsorted, _unsorted])
+def test_check_all_unsorted(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_unsorted, _unsorted, _unsorted))
     expected_msgs = [
         f"ERROR: {escape_path(paths[0])} is incorrectly sorted\n",
         f"ERROR: {escape_path(paths[1])} is incorrectly sorted\n",
         f"ERROR: {escape_path(paths[2])} is incorrectly sorted\n",
-        "3 files would be resorted\n",
+        _summary(resorted=3, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_one_syntax_error(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_syntax, _good, _good])
+def test_check_one_syntax_error(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_syntax, _good, _good))
     expected_msgs = [
         f"ERROR: syntax error in {escape_path(paths[0])}: line 3, column 5\n",
-        "2 files would be left unchanged, 1 file would not be sortable\n",
+        _summary(unchanged=2, unsortable=1, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_all_syntax_error(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_syntax, _syntax, _syntax])
+def test_check_all_syntax_error(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_syntax, _syntax, _syntax))
     expected_msgs = [
         f"ERROR: syntax error in {escape_path(paths[0])}: line 3, column 5\n",
         f"ERROR: syntax error in {escape_path(paths[1])}: line 3, column 5\n",
         f"ERROR: syntax error in {escape_path(paths[2])}: line 3, column 5\n",
-        "3 files would not be sortable\n",
+        _summary(unsortable=3, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_resolution_error(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_resolution, _good, _good])
+def test_check_resolution_error(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_resolution, _good, _good))
     expected_msgs = [
         f"ERROR: unresolved dependency '_other' in {escape_path(paths[0])}: line 6, column 11\n",
-        "2 files would be left unchanged, 1 file would not be sortable\n",
+        _summary(unchanged=2, unsortable=1, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_double_resolution_error(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_double_resolution, _good, _good])
+def test_check_double_resolution_error(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_double_resolution, _good, _good))
     expected_msgs = [
         f"ERROR: unresolved dependency '_other' in {escape_path(paths[0])}: line 6, column 11\n",
         f"ERROR: unresolved dependency '_same' in {escape_path(paths[0])}: line 6, column 22\n",
-        "2 files would be left unchanged, 1 file would not be sortable\n",
+        _summary(unchanged=2, unsortable=1, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_check_one_unsorted_one_syntax_error(check, tmp_path):
-    paths = _write_fixtures(tmp_path, [_syntax, _unsorted, _good])
+def test_check_one_unsorted_one_syntax_error(check, fixture_dirs):
+    dirpath, paths = fixture_dirs((_syntax, _unsorted, _good))
     expected_msgs = [
         f"ERROR: syntax error in {escape_path(paths[0])}: line 3, column 5\n",
         f"ERROR: {escape_path(paths[1])} is incorrectly sorted\n",
-        "1 file would be resorted, 1 file would be left unchanged, 1 file would not be sortable\n",
+        _summary(resorted=1, unchanged=1, unsortable=1, check=True),
     ]
     expected_status = 1
-    actual_msgs, actual_status = check(tmp_path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    actual_msgs, actual_status = check(dirpath)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_all_well(osort, tmp_path):
     _write_fixtures(tmp_path, [_good, _good, _good])
 
     expected_msgs = [
-        "3 files were left unchanged\n",
+        _summary(unchanged=3),
     ]
     expected_status = 0
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_one_unsorted(osort, tmp_path):
@@ -213,13 +278,14 @@ def test_osort_one_unsorted(osort, tmp_path):
 
     expected_msgs = [
         f"Sorting {escape_path(paths[0])}\n",
-        "1 file was resorted, 2 files were left unchanged\n",
+        _summary(resorted=1, unchanged=2),
     ]
     expected_status = 0
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_all_unsorted(osort, tmp_path):
@@ -229,13 +295,14 @@ def test_osort_all_unsorted(osort, tmp_path):
         f"Sorting {escape_path(paths[0])}\n",
         f"Sorting {escape_path(paths[1])}\n",
         f"Sorting {escape_path(paths[2])}\n",
-        "3 files were resorted\n",
+        _summary(resorted=3),
     ]
     expected_status = 0
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_one_syntax_error(osort, tmp_path):
@@ -243,13 +310,14 @@ def test_osort_one_syntax_error(osort, tmp_path):
 
     expected_msgs = [
         f"ERROR: syntax error in {escape_path(paths[0])}: line 3, column 5\n",
-        "2 files were left unchanged, 1 file was not sortable\n",
+        _summary(unchanged=2, unsortable=1),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_all_syntax_error(osort, tmp_path):
@@ -259,13 +327,14 @@ def test_osort_all_syntax_error(osort, tmp_path):
         f"ERROR: syntax error in {escape_path(paths[0])}: line 3, column 5\n",
         f"ERROR: syntax error in {escape_path(paths[1])}: line 3, column 5\n",
         f"ERROR: syntax error in {escape_path(paths[2])}: line 3, column 5\n",
-        "3 files were not sortable\n",
+        _summary(unsortable=3),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_resolution_error(osort, tmp_path):
@@ -273,13 +342,14 @@ def test_osort_resolution_error(osort, tmp_path):
 
     expected_msgs = [
         f"ERROR: unresolved dependency '_other' in {escape_path(paths[0])}: line 6, column 11\n",
-        "2 files were left unchanged, 1 file was not sortable\n",
+        _summary(unchanged=2, unsortable=1),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_one_unsorted_one_syntax_error(osort, tmp_path):
@@ -288,13 +358,14 @@ def test_osort_one_unsorted_one_syntax_error(osort, tmp_path):
     expected_msgs = [
         f"ERROR: syntax error in {escape_path(paths[0])}: line 3, column 5\n",
         f"Sorting {escape_path(paths[1])}\n",
-        "1 file was resorted, 1 file was left unchanged, 1 file was not sortable\n",
+        _summary(resorted=1, unchanged=1, unsortable=1),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_encoding_error(osort, tmp_path):
@@ -302,13 +373,14 @@ def test_osort_encoding_error(osort, tmp_path):
 
     expected_msgs = [
         f"ERROR: unknown encoding, 'invalid-encoding', in {escape_path(paths[0])}\n",
-        "1 file was not sortable\n",
+        _summary(unsortable=1),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_character_error(osort, tmp_path):
@@ -316,13 +388,14 @@ def test_osort_character_error(osort, tmp_path):
 
     expected_msgs = [
         f"ERROR: encoding error in {escape_path(paths[0])}: 'ascii' codec can't decode byte 0xfe in position 16: ordinal not in range(128)\n",
-        "1 file was not sortable\n",
+        _summary(unsortable=1),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_preserve_crlf_endlines(osort, tmp_path):
@@ -333,13 +406,13 @@ def test_osort_preserve_crlf_endlines(osort, tmp_path):
 
     expected_msgs = [
         f"Sorting {escape_path(paths[0])}\n",
-        "1 file was resorted\n",
+        _summary(resorted=1),
     ]
     expected_status = 0
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert actual_msgs == expected_msgs
+    assert actual_msgs == "".join(expected_msgs)
     assert actual_status == expected_status
 
     (output,) = [pathlib.Path(path).read_bytes() for path in paths]
@@ -347,12 +420,15 @@ def test_osort_preserve_crlf_endlines(osort, tmp_path):
 
 
 def test_osort_empty_dir(osort, tmp_path):
-    expected_msgs = ["No files are present to be sorted. Nothing to do.\n"]
+    expected_msgs = [
+        _summary(),
+    ]
     expected_status = 0
 
     actual_msgs, actual_status = osort(tmp_path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_non_existent_file(osort, tmp_path):
@@ -360,22 +436,26 @@ def test_osort_non_existent_file(osort, tmp_path):
 
     expected_msgs = [
         f"ERROR: {escape_path(path)} does not exist\n",
-        "1 file was not sortable\n",
+        _summary(unsortable=1),
     ]
     expected_status = 1
 
     actual_msgs, actual_status = osort(path)
 
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 def test_osort_no_py_extension(osort, tmp_path):
     path = tmp_path / "file"
     path.write_bytes(_good)
-    expected_msgs = ["1 file was left unchanged\n"]
+    expected_msgs = [
+        _summary(unchanged=1),
+    ]
     expected_status = 0
     actual_msgs, actual_status = osort(path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
 @pytest.mark.skipif(
@@ -384,39 +464,88 @@ def test_osort_no_py_extension(osort, tmp_path):
 def test_osort_unreadable_file(osort, tmp_path):
     path = tmp_path / "file.py"
     path.write_bytes(_good)
-    path.chmod(0)
     expected_msgs = [
         f"ERROR: {escape_path(path)} is not readable\n",
-        "1 file was not sortable\n",
+        _summary(unsortable=1),
     ]
     expected_status = 1
-    actual_msgs, actual_status = osort(path)
-    assert (actual_msgs, actual_status) == (expected_msgs, expected_status)
+    path.chmod(0)
+    try:
+        actual_msgs, actual_status = osort(path)
+    finally:
+        # Restore the mode so that cleaning up `tmp_path` doesn't have to.
+        path.chmod(0o644)
+    assert actual_msgs == "".join(expected_msgs)
+    assert actual_status == expected_status
 
 
-def test_osort_version():
+def test_osort_version(osort_exe):
     result = subprocess.run(
-        ["osort", "--version"],
+        [osort_exe, "--version"],
         capture_output=True,
+        close_fds=False,
         encoding="utf-8",
     )
     output = result.stdout
     assert output == f"osort {__version__}\n"
 
 
-def test_osort_run_module():
+def test_osort_run_module(osort_exe):
     entrypoint_result = subprocess.run(
-        ["osort", "--help"],
+        [osort_exe, "--help"],
         capture_output=True,
-        encoding="utf-8",
+        close_fds=False,
     )
-    entrypoint_output = entrypoint_result.stderr.splitlines(keepends=True)
+    entrypoint_output = entrypoint_result.stderr.decode("utf-8")
 
     module_result = subprocess.run(
         [sys.executable, "-m", "osort", "--help"],
         capture_output=True,
-        encoding="utf-8",
+        close_fds=False,
     )
-    module_output = module_result.stderr.splitlines(keepends=True)
+    module_output = module_result.stderr.decode("utf-8")
 
     assert module_output == entrypoint_output
+
+
+def test_check_run_module(osort_exe, fixture_dirs):
+    dirpath, _ = fixture_dirs((_unsorted, _good))
+
+    entrypoint_result = subprocess.run(
+        [osort_exe, "--check", str(dirpath)],
+        capture_output=True,
+        close_fds=False,
+    )
+
+    module_result = subprocess.run(
+        [sys.executable, "-m", "osort", "--check", str(dirpath)],
+        capture_output=True,
+        close_fds=False,
+    )
+
+    assert entrypoint_result.returncode == 1
+    assert module_result.returncode == entrypoint_result.returncode
+    assert module_result.stderr == entrypoint_result.stderr
+
+
+def test_module_parity(osort_exe, tmp_path):
+    results = {}
+    for name, command in [
+        ("entrypoint", [osort_exe]),
+        ("module", [sys.executable, "-m", "osort"]),
+    ]:
+        dirpath = tmp_path / name
+        dirpath.mkdir()
+        paths = _write_fixtures(dirpath, [_good, _unsorted])
+
+        result = subprocess.run(
+            [*command, "."],
+            capture_output=True,
+            close_fds=False,
+            cwd=dirpath,
+        )
+        outputs = [pathlib.Path(path).read_bytes() for path in paths]
+        results[name] = result.stderr, result.returncode, outputs
+
+    assert results["entrypoint"][2] == [_good, _good]
+    assert results["module"] == results["entrypoint"]
@@ -3,7 +3,7 @@ import textwrap
 
 import pytest
 
-from osort import osort
+from osort import _osort, osort
 
 type_parameter_syntax = pytest.mark.skipif(
     sys.version_info < (3, 12),
@@ -36,6 +36,32 @@ def test_trailing_newline():
     assert actual == expected
 
 
+def test_enable_cache(monkeypatch):
+    original = _clean(
+        """
+        def public():
+            return _private()
+        def _private():
+            pass
+        """
+    )
+    expected = _clean(
+        """
+        def _private():
+            pass
+        def public():
+            return _private()
+        """
+    )
+    assert osort(original, enable_cache=True) == expected
+
+    def _osort_text(*args, **kwargs):
+        raise AssertionError("cached result not used")
+
+    monkeypatch.setattr(_osort, "_osort_text", _osort_text)
+    assert osort(original, enable_cache=True) == expected
+
+
 def test_cycle():
     original = _clean(
         """
@@ -688,6 +714,22 @@ def test_osort_self_positional_only():
     assert actual == expected
 
 
+def test_osort_class_method_bare_call_decorator():
+    original = _clean(
+        """
+        from functools import lru_cache
+
+        class C:
+            @lru_cache()
+            def fun(self):
+                pass
+        """
+    )
+    expected = original
+    actual = osort(original)
+    assert actual == expected
+
+
 def test_single_line_dummy_function():
     original = "def fun(): ...\n"
     expected = "def fun(): ...\n"
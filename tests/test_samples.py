@@ -12,14 +12,20 @@ def pytest_generate_tests(metafunc):
     samples.sort()
     assert samples
 
-    metafunc.parametrize("sample", samples)
+    metafunc.parametrize(
+        ("sample", "input_text"),
+        [
+            (sample, (samples_dir / f"{sample}_input.py").read_bytes())
+            for sample in samples
+        ],
+        ids=samples,
+    )
 
 
-# def test_samples(sample):
+# def test_samples(sample, input_text):
 #     samples_dir = pathlib.Path("test_data/samples")
 #     input_path = samples_dir / f"{sample}_input.py"
 #     output_path = samples_dir / f"{sample}_output.py"
-#     input_text = input_path.read_bytes()
 #
 #     actual_text = osort(
 #         input_text,
@@ -36,16 +42,19 @@ def pytest_generate_tests(metafunc):
 #     assert actual_text == expected_text
 
 
-def test_idempotent(sample):
+def test_idempotent(sample, input_text):
     samples_dir = pathlib.Path("test_data/samples")
     input_path = samples_dir / f"{sample}_input.py"
-    input_text = input_path.read_bytes()
 
     sorted_text = osort(
         input_text,
         filename=str(input_path),
         on_wildcard_import=lambda **kwargs: None,
     )
+    if sorted_text == input_text:
+        # Sorting the same text again would give the same result.
+        return
+
     resorted_text = osort(
         sorted_text,
         filename=str(input_path),